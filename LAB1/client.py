@@ -3,6 +3,101 @@ import sys
 import os
 from urllib.parse import urlparse
 
+RECV_SIZE = 65536
+
+# Open connections keyed by (host, port), reused across downloads
+connections = {}
+
+def get_connection(host, port):
+    s = connections.get((host, port))
+    if s is None:
+        s = socket.create_connection((host, port))
+        # small request writes go out immediately; keepalive probes the idle reused connection
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        connections[(host, port)] = s
+    return s
+
+def close_connection(host, port):
+    s = connections.pop((host, port), None)
+    if s is not None:
+        s.close()
+
+def read_headers(s):
+    """Read up to the end of the headers; returns (headers, body bytes already received) or None if the server hung up"""
+    buf = bytearray()
+    while b"\r\n\r\n" not in buf:
+        chunk = s.recv(RECV_SIZE)
+        if not chunk:
+            return None
+        buf += chunk
+
+    header, _, body = bytes(buf).partition(b"\r\n\r\n")
+    return header.decode(errors="ignore"), body
+
+def get_content_length(headers):
+    for line in headers.split("\r\n")[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            return int(value.strip())
+    return None
+
+def send_request(host, port, path):
+    """Send a GET and read the response headers; returns (socket, headers, body bytes already received)"""
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n"
+
+    # A reused connection may have been closed by the server, so retry once on a fresh one
+    for attempt in range(2):
+        s = get_connection(host, port)
+        try:
+            s.sendall(request.encode())
+            result = read_headers(s)
+        except OSError:
+            result = None
+
+        if result is not None:
+            headers, body = result
+            return s, headers, body
+
+        close_connection(host, port)
+
+    raise ConnectionError(f"No response from {host}:{port}")
+
+def iter_body(host, port, s, headers, body):
+    """Yield the response body in chunks without holding all of it in memory"""
+    content_length = get_content_length(headers)
+
+    if content_length is None:
+        # No framing, the body runs until the server closes the connection
+        if body:
+            yield body
+        while True:
+            chunk = s.recv(RECV_SIZE)
+            if not chunk:
+                break
+            yield chunk
+        close_connection(host, port)
+        return
+
+    body = body[:content_length]
+    remaining = content_length - len(body)
+    if body:
+        yield body
+    while remaining > 0:
+        chunk = s.recv(min(RECV_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+    if "connection: close" in headers.lower():
+        close_connection(host, port)
+
+def save_body(chunks, file_path):
+    with open(file_path, "wb") as f:
+        for chunk in chunks:
+            f.write(chunk)
+
 def download(url, save_dir):
     parsed = urlparse(url)
     host = parsed.hostname
@@ -13,46 +108,35 @@ def download(url, save_dir):
     if not os.path.exists(save_dir):
         os.makedirs(save_dir)
 
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.connect((host, port))
-        request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n"
-        s.sendall(request.encode())
-
-        response = b""
-        while True:
-            chunk = s.recv(1024)
-            if not chunk:
-                break
-            response += chunk
-
-    header, _, body = response.partition(b"\r\n\r\n")
-    headers = header.decode(errors="ignore")
+    s, headers, body = send_request(host, port, path)
+    chunks = iter_body(host, port, s, headers, body)
 
     if "Content-Type: text/html" in headers:
-        print(body.decode(errors="ignore"))
+        print(b"".join(chunks).decode(errors="ignore"))
     elif "Content-Type: image/png" in headers:
         file_path = os.path.join(save_dir, filename or "download.png")
-        with open(file_path, "wb") as f:
-            f.write(body)
+        save_body(chunks, file_path)
         print(f"Saved PNG as {file_path}")
     elif "Content-Type: application/pdf" in headers:
         file_path = os.path.join(save_dir, filename or "download.pdf")
-        with open(file_path, "wb") as f:
-            f.write(body)
+        save_body(chunks, file_path)
         print(f"Saved PDF as {file_path}")
     else:
         print("Unknown content type")
         file_path = os.path.join(save_dir, filename or "download.bin")
-        with open(file_path, "wb") as f:
-            f.write(body)
+        save_body(chunks, file_path)
         print(f"Saved unknown file as {file_path}")
 
 if __name__ == "__main__":
     if len(sys.argv) < 3:
-        print("Usage: python client.py <URL> <save_directory>")
+        print("Usage: python client.py <URL> [<URL> ...] <save_directory>")
         sys.exit(1)
 
-    url = sys.argv[1]
-    save_dir = sys.argv[2]
+    urls = sys.argv[1:-1]
+    save_dir = sys.argv[-1]
+
+    for url in urls:
+        download(url, save_dir)
 
-    download(url, save_dir)
+    for host, port in list(connections):
+        close_connection(host, port)
@@ -1,9 +1,12 @@
 import socket
 import sys
 import os
-import mimetypes
+import stat
+import threading
+from collections import OrderedDict
 from urllib.parse import unquote
 import time  # for simulating work
+from concurrent.futures import ThreadPoolExecutor
 
 if len(sys.argv) < 2:
     print("Usage: python server.py <directory_to_serve>")
@@ -13,66 +16,217 @@ root_dir = sys.argv[1]
 
 HOST = '0.0.0.0'
 PORT = 8080
+MAX_WORKERS = 64
+RECV_SIZE = 4096
+MAX_HEADER_BYTES = 65536
+KEEP_ALIVE_TIMEOUT = 5  # seconds an idle connection is kept open
+MAX_DISCARD_BYTES = 1024 * 1024  # larger request bodies aren't read, the connection is closed instead
+
+# Fixed response parts, encoded once at import instead of on every request
+# (every response carries Content-Length so the connection can be reused)
+DIR_HEADER = b"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\nContent-Length: %d\r\n%b\r\n"
+NOT_FOUND_HEADER = b"HTTP/1.1 404 Not Found\r\nContent-Type: text/html\r\nContent-Length: %d\r\n%b\r\n"
+FILE_HEADER = b"HTTP/1.1 200 OK\r\nContent-Type: %b\r\nContent-Length: %d\r\n%b\r\n"
+CONNECTION_KEEP_ALIVE = b"Connection: keep-alive\r\nKeep-Alive: timeout=%d\r\n" % KEEP_ALIVE_TIMEOUT
+CONNECTION_CLOSE = b"Connection: close\r\n"
+
+# Content types by file extension, already encoded for FILE_HEADER
+MIME_TYPES = {
+    ".html": b"text/html",
+    ".htm": b"text/html",
+    ".css": b"text/css",
+    ".js": b"application/javascript",
+    ".json": b"application/json",
+    ".txt": b"text/plain",
+    ".pdf": b"application/pdf",
+    ".png": b"image/png",
+    ".jpg": b"image/jpeg",
+    ".jpeg": b"image/jpeg",
+    ".gif": b"image/gif",
+    ".svg": b"image/svg+xml",
+    ".ico": b"image/x-icon",
+}
+DEFAULT_MIME_TYPE = b"application/octet-stream"
+
+# Rendered directory listings keyed by (fs_path, request_path, st_mtime_ns), so a
+# listing is only rebuilt when the directory changes; least recently used first
+LISTING_CACHE_SIZE = 128
+listing_cache = OrderedDict()
+listing_cache_lock = threading.Lock()
 
 
 def generate_directory_listing(path, request_path):
     items = os.listdir(path)
-    html = f"<html><body><h2>Directory listing for {request_path}</h2><ul>"
+    parts = [f"<html><body><h2>Directory listing for {request_path}</h2><ul>"]
 
     if request_path != "/":
         parent_path = os.path.dirname(request_path.rstrip('/'))
-        html += f'<li><a href="{parent_path or "/"}">.. (parent directory)</a></li>'
+        parts.append(f'<li><a href="{parent_path or "/"}">.. (parent directory)</a></li>')
+
+    parts.extend(f'<li><a href="{os.path.join(request_path, item)}">{item}</a></li>' for item in items)
+
+    parts.append('<li><a href="missing_file.html">Click to test 404 error</a></li>')
+    parts.append("</ul></body></html>")
+    return "".join(parts).encode()
+
+
+def get_directory_listing(path, request_path, mtime_ns):
+    key = (path, request_path, mtime_ns)
+    with listing_cache_lock:
+        content = listing_cache.get(key)
+        if content is not None:
+            listing_cache.move_to_end(key)
+            return content
+
+    content = generate_directory_listing(path, request_path)
+
+    with listing_cache_lock:
+        listing_cache[key] = content
+        if len(listing_cache) > LISTING_CACHE_SIZE:
+            listing_cache.popitem(last=False)
+    return content
+
+
+def send_file(conn, f, size):
+    """Send size bytes of f over conn without reading the file into memory"""
+    # socket.sendfile uses sendfile(2), so the kernel copies straight from the page
+    # cache to the socket. Unlike a bare os.sendfile it waits for the socket when the
+    # send buffer is full (the keep-alive timeout makes the fd non-blocking), and it
+    # falls back to a read/send loop by itself where sendfile is unavailable.
+    conn.sendfile(f, 0, size)
+
+
+def read_request(conn, buf):
+    """Return the next request head from conn, or None once the client is done.
+
+    buf holds bytes already received on this connection; anything after the
+    head (the request body, see skip_body, or a pipelined request) stays in it.
+    """
+    while True:
+        end = buf.find(b"\r\n\r\n")
+        if end != -1:
+            head = bytes(buf[:end])
+            del buf[:end + 4]
+            return head
+        if len(buf) >= MAX_HEADER_BYTES:
+            return None
+        chunk = conn.recv(RECV_SIZE)
+        if not chunk:
+            # client closed: serve what we got (if anything), then stop
+            head = bytes(buf)
+            buf.clear()
+            return head or None
+        buf += chunk
+
+
+def parse_headers(head):
+    """Header fields of a request head as {lower-cased name: value} bytes"""
+    headers = {}
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def wants_keep_alive(headers, version):
+    """HTTP/1.1 stays open unless the client sends Connection: close; HTTP/1.0 only on request"""
+    connection = headers.get(b"connection")
+    if connection is not None:
+        return connection.lower() == b"keep-alive"
+    return version == b"HTTP/1.1"
+
+
+def skip_body(conn, buf, headers):
+    """Drop the request body (the server never uses it) so the next request starts at
+    the right byte. Returns False if the body can't be framed and the connection must close."""
+    if b"transfer-encoding" in headers:
+        return False
+    value = headers.get(b"content-length")
+    if value is None:
+        return True
+    try:
+        remaining = int(value)
+    except ValueError:
+        return False
+    if remaining < 0 or remaining > MAX_DISCARD_BYTES:
+        return False
+
+    buffered = min(remaining, len(buf))
+    del buf[:buffered]
+    remaining -= buffered
+    while remaining > 0:
+        chunk = conn.recv(min(RECV_SIZE, remaining))
+        if not chunk:
+            return False
+        remaining -= len(chunk)
+    return True
+
+
+def handle_request(conn, head, buf):
+    """Serve one request; returns True if the connection can be reused"""
+    # Only the request line is split and decoded, not the whole request
+    line_end = head.find(b"\r\n")
+    if line_end == -1:
+        line_end = len(head)
+    parts = head[:line_end].split(b" ", 2)
+    if len(parts) < 2:
+        return False
+    method, path = parts[0].decode("ascii", "replace"), parts[1]
+    path = unquote(path.decode())
+    fs_path = os.path.join(root_dir, path.lstrip("/"))
+
+    # Only GET and HEAD are framed the way a reused connection needs; anything
+    # else still gets a response, but the connection is closed afterwards
+    headers = parse_headers(head)
+    body_skipped = skip_body(conn, buf, headers)
+    keep_alive = (body_skipped and method in ("GET", "HEAD") and len(parts) == 3
+                  and wants_keep_alive(headers, parts[2].strip()))
+    connection = CONNECTION_KEEP_ALIVE if keep_alive else CONNECTION_CLOSE
+    # A HEAD response carries the same headers (including Content-Length) but no body
+    send_body = method != "HEAD"
+
+    # simulate work for 1 second
+    time.sleep(1)
+
+    try:
+        st = os.stat(fs_path)
+    except OSError:
+        st = None
 
-    for item in items:
-        item_path = os.path.join(request_path, item)
-        html += f'<li><a href="{item_path}">{item}</a></li>'
+    if st is not None and stat.S_ISDIR(st.st_mode):
+        content = get_directory_listing(fs_path, path, st.st_mtime_ns)
+        header = DIR_HEADER % (len(content), connection)
+        conn.sendall(b"".join((header, content)) if send_body else header)
+        return keep_alive
 
-    html += '<li><a href="missing_file.html">Click to test 404 error</a></li>'
-    html += "</ul></body></html>"
-    return html.encode()
+    if st is None or not stat.S_ISREG(st.st_mode):
+        body = f"<html><body><h1>404 Not Found</h1><p>{path} not found.</p></body></html>".encode()
+        header = NOT_FOUND_HEADER % (len(body), connection)
+        conn.sendall(b"".join((header, body)) if send_body else header)
+        return keep_alive
 
+    mime_type = MIME_TYPES.get(os.path.splitext(fs_path)[1].lower(), DEFAULT_MIME_TYPE)
 
-def handle_request(conn):
-    try:
-        request = conn.recv(1024).decode()
-        if not request:
-            return
-        lines = request.splitlines()
-        if len(lines) == 0:
-            return
-        request_line = lines[0]
-        parts = request_line.split()
-        if len(parts) < 2:
-            return
-        method, path = parts[0], parts[1]
-        path = unquote(path)
-        fs_path = os.path.join(root_dir, path.lstrip("/"))
-
-        # simulate work for 1 second
-        time.sleep(1)
-
-        if os.path.isdir(fs_path):
-            content = generate_directory_listing(fs_path, path)
-            header = "HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n"
-            conn.sendall(header.encode() + content)
-            return
-
-        if not os.path.isfile(fs_path):
-            header = "HTTP/1.1 404 Not Found\r\nContent-Type: text/html\r\n\r\n"
-            body = f"<html><body><h1>404 Not Found</h1><p>{path} not found.</p></body></html>"
-            conn.sendall(header.encode() + body.encode())
-            return
-
-        mime_type, _ = mimetypes.guess_type(fs_path)
-        if mime_type is None:
-            mime_type = "application/octet-stream"
+    size = st.st_size
+    conn.sendall(FILE_HEADER % (mime_type, size, connection))
 
+    if send_body:
         with open(fs_path, "rb") as f:
-            content = f.read()
+            send_file(conn, f, size)
+    return keep_alive
 
-        header = f"HTTP/1.1 200 OK\r\nContent-Type: {mime_type}\r\nContent-Length: {len(content)}\r\n\r\n"
-        conn.sendall(header.encode() + content)
 
+def handle_connection(conn):
+    """Serve requests on conn until the client closes, asks to close, or idles out"""
+    conn.settimeout(KEEP_ALIVE_TIMEOUT)
+    buf = bytearray()
+    try:
+        while True:
+            head = read_request(conn, buf)
+            if head is None or not handle_request(conn, head, buf):
+                break
+    except socket.timeout:
+        pass  # idle keep-alive connection
     except Exception as e:
         print("Error handling request:", e)
     finally:
@@ -80,14 +234,21 @@ def handle_request(conn):
 
 
 def main():
+    # A slow client only ties up one worker instead of blocking every other connection;
+    # a keep-alive connection holds its worker until it closes or idles out
+    pool = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+
     with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         s.bind((HOST, PORT))
-        s.listen(5)
-        print(f"Serving HTTP on {HOST}:{PORT} from {root_dir} (single-threaded)")
+        s.listen(128)
+        print(f"Serving HTTP on {HOST}:{PORT} from {root_dir} ({MAX_WORKERS} worker threads)")
 
         while True:
             conn, addr = s.accept()
-            handle_request(conn)
+            # responses are small, don't let Nagle hold back the first segment
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            pool.submit(handle_connection, conn)
 
 
 if __name__ == "__main__":
@@ -1,24 +1,57 @@
-import socket
+import asyncio
 import os
+import socket
+import stat
 import mimetypes
 from urllib.parse import unquote
-import threading
+from collections import Counter, deque, OrderedDict
+from functools import lru_cache
 import time
 
 HOST = '0.0.0.0'
 PORT = 8081
 ROOT_DIR = os.path.abspath("./src")
 
+# Demo-only delays, off unless requested:
+#   SIMULATE_WORK=0.5  seconds of fake work per request (concurrency demo)
+#   DEMO_RACE=1        widen the naive counter's race window (race condition demo)
+SIMULATE_WORK = float(os.getenv("SIMULATE_WORK", "0"))
+DEMO_RACE = os.getenv("DEMO_RACE", "0") not in ("", "0")
+
+# USE_UVLOOP=1 runs on uvloop (if installed) instead of the stock asyncio loop.
+# Off by default: uvloop has no loop.sendfile, so large files would be copied
+# through Python instead of going out with sendfile(2).
+USE_UVLOOP = os.getenv("USE_UVLOOP", "0") not in ("", "0")
+uvloop = None
+if USE_UVLOOP:
+    try:
+        import uvloop
+    except ImportError:
+        print("USE_UVLOOP is set but uvloop is not installed, using the asyncio event loop")
+
 # Request counters
 request_counts_naive = {}
-request_counts_safe = {}
-request_counts_lock = threading.Lock()
+request_counts_safe = Counter()  # only written from the event loop thread
 
 # Rate limiting
-RATE_LIMIT = 5
+RATE_LIMIT = int(os.getenv("RATE_LIMIT", "5"))  # requests per client per window; raise it for load tests
 WINDOW_SECONDS = 1
-rate_limits = {}        # client_ip -> list of timestamps
-rate_lock = threading.Lock()
+rate_limits = {}        # client_ip -> deque of timestamps, oldest first (only touched from the event loop)
+RATE_LIMIT_SWEEP_SECONDS = 60
+last_rate_limit_sweep = 0.0
+
+# Small static files kept in memory, keyed by path and validated against the
+# file's (mtime, size); least recently used first. Only touched from the event loop.
+FILE_CACHE_MAX_FILE_BYTES = 1024 * 1024
+FILE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+file_cache = OrderedDict()   # fs_path -> ((st_mtime_ns, st_size), content)
+file_cache_bytes = 0
+
+# Fixed response parts, encoded once at import instead of on every request
+TOO_MANY_REQUESTS_RESPONSE = (b"HTTP/1.1 429 Too Many Requests\r\nContent-Type: text/html\r\n\r\n"
+                              b"<h1>429 Too Many Requests</h1><p>Rate limit exceeded.</p>")
+NOT_FOUND_HEADER = b"HTTP/1.1 404 Not Found\r\nContent-Type: text/html\r\n\r\n"
+DIR_HEADER = b"HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n"
 
 
 def generate_directory_listing(fs_dir_path, request_path):
@@ -45,122 +78,240 @@ def generate_directory_listing(fs_dir_path, request_path):
     return html.encode()
 
 
+def parse_request_line(request):
+    """Return (method, path) from the raw request bytes, or None if the request line is malformed.
+
+    Works on bytes: only the request line is split and only the method and
+    path are decoded, instead of decoding and splitting the whole request.
+    """
+    line_end = request.find(b"\r\n")
+    request_line = request if line_end == -1 else request[:line_end]
+    parts = request_line.split()
+    if len(parts) < 2:
+        return None
+    return parts[0].decode("ascii", "replace"), unquote(parts[1].decode())
+
+
+def stat_path(fs_path):
+    """One stat(2) per request; None if the path does not exist."""
+    try:
+        return os.stat(fs_path)
+    except OSError:
+        return None
+
+
+def set_cork(writer, enabled):
+    """Toggle TCP_CORK (Linux) so the header and first file bytes leave in full segments."""
+    sock = writer.get_extra_info("socket")
+    if sock is None or not hasattr(socket, "TCP_CORK"):
+        return
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1 if enabled else 0)
+    except OSError:
+        pass
+
+
+async def send_file(loop, writer, fs_path):
+    with open(fs_path, "rb") as f:
+        try:
+            # sendfile(2): the bytes go from the page cache to the socket
+            # without passing through Python
+            await loop.sendfile(writer.transport, f)
+        except NotImplementedError:
+            # Event loops without sendfile support (uvloop): copy in chunks
+            while True:
+                chunk = await loop.run_in_executor(None, f.read, 65536)
+                if not chunk:
+                    break
+                writer.write(chunk)
+                await writer.drain()
+
+
+def read_file(fs_path):
+    with open(fs_path, "rb") as f:
+        return f.read()
+
+
+def get_cached_file(fs_path, st):
+    """Return the cached content of fs_path, or None if missing or stale."""
+    entry = file_cache.get(fs_path)
+    if entry is None or entry[0] != (st.st_mtime_ns, st.st_size):
+        return None
+    file_cache.move_to_end(fs_path)
+    return entry[1]
+
+
+def cache_file(fs_path, st, content):
+    global file_cache_bytes
+    old = file_cache.pop(fs_path, None)
+    if old is not None:
+        file_cache_bytes -= len(old[1])
+
+    file_cache[fs_path] = ((st.st_mtime_ns, st.st_size), content)
+    file_cache_bytes += len(content)
+
+    # evict least recently used files until we are back under budget
+    while file_cache_bytes > FILE_CACHE_MAX_BYTES:
+        _, (_, evicted) = file_cache.popitem(last=False)
+        file_cache_bytes -= len(evicted)
+
+
+@lru_cache(maxsize=1024)
+def guess_mime_type(fs_path):
+    mime_type, _ = mimetypes.guess_type(fs_path)
+    return mime_type or "application/octet-stream"
+
+
+def sweep_rate_limits(current_time):
+    """Forget clients with no request inside the window, so idle IPs don't pile up."""
+    global last_rate_limit_sweep
+    if current_time - last_rate_limit_sweep < RATE_LIMIT_SWEEP_SECONDS:
+        return
+    last_rate_limit_sweep = current_time
+
+    idle = [ip for ip, timestamps in rate_limits.items()
+            if not timestamps or current_time - timestamps[-1] >= WINDOW_SECONDS]
+    for ip in idle:
+        del rate_limits[ip]
+
+
 def is_rate_limited(client_ip):
     """Return True if client exceeded RATE_LIMIT per WINDOW_SECONDS."""
+    # No await in here, so the check-and-append runs atomically on the event loop
     current_time = time.time()
-    with rate_lock:
-        if client_ip not in rate_limits:
-            rate_limits[client_ip] = []
+    sweep_rate_limits(current_time)
+
+    timestamps = rate_limits.get(client_ip)
+    if timestamps is None:
+        timestamps = rate_limits[client_ip] = deque()
 
-        # remove old timestamps
-        rate_limits[client_ip] = [ts for ts in rate_limits[client_ip] if current_time - ts < WINDOW_SECONDS]
+    # remove old timestamps from the front
+    while timestamps and current_time - timestamps[0] >= WINDOW_SECONDS:
+        timestamps.popleft()
 
-        if len(rate_limits[client_ip]) >= RATE_LIMIT:
-            return True
+    if len(timestamps) >= RATE_LIMIT:
+        return True
 
-        # new ts
-        rate_limits[client_ip].append(current_time)
-        return False
+    # new ts
+    timestamps.append(current_time)
+    return False
 
 
-def handle_request(conn, addr):
-    client_ip, client_port = addr
-    thread_name = threading.current_thread().name
-    print(f"[{thread_name} (handle_client)] Request from {addr}: starting")
+async def handle_request(reader, writer):
+    addr = writer.get_extra_info("peername")
+    client_ip, client_port = addr[0], addr[1]
+    task_name = asyncio.current_task().get_name()
+    loop = asyncio.get_running_loop()
+    print(f"[{task_name} (handle_client)] Request from {addr}: starting")
 
     try:
         # Check rate limit
         if is_rate_limited(client_ip):
-            header = "HTTP/1.1 429 Too Many Requests\r\nContent-Type: text/html\r\n\r\n"
-            body = "<h1>429 Too Many Requests</h1><p>Rate limit exceeded.</p>"
-            conn.sendall(header.encode() + body.encode())
-            print(f"[{thread_name}] Rate limit exceeded for {client_ip}")
+            writer.write(TOO_MANY_REQUESTS_RESPONSE)
+            await writer.drain()
+            print(f"[{task_name}] Rate limit exceeded for {client_ip}")
             return
 
-        request = conn.recv(1024).decode()
+        request = await reader.read(1024)
         if not request:
-            print(f"[{thread_name}] Empty request from {addr}")
+            print(f"[{task_name}] Empty request from {addr}")
             return
 
-        lines = request.splitlines()
-        if len(lines) == 0:
-            print(f"[{thread_name}] Malformed request from {addr}")
+        parsed = parse_request_line(request)
+        if parsed is None:
+            print(f"[{task_name}] Malformed request from {addr}")
             return
 
-        request_line = lines[0]
-        parts = request_line.split()
-        if len(parts) < 2:
-            print(f"[{thread_name}] Invalid request line: {request_line}")
-            return
-
-        method, path = parts[0], parts[1]
-        path = unquote(path)
+        method, path = parsed
 
         fs_path = os.path.abspath(os.path.join(ROOT_DIR, path.lstrip("/")))
 
-        print(f"[{thread_name}] Requested path: {path}")
+        print(f"[{task_name}] Requested path: {path}")
+
+        if SIMULATE_WORK:
+            await asyncio.sleep(SIMULATE_WORK)  # simulate work
 
-        time.sleep(0.5)  # simulate work
+        st = await loop.run_in_executor(None, stat_path, fs_path)
 
         # Increment counters if path exists
-        if os.path.exists(fs_path):
-            # Naive counter (race-prone)
+        if st is not None:
+            # Naive counter (race-prone: other tasks run during the await)
             if fs_path not in request_counts_naive:
                 request_counts_naive[fs_path] = 0
             temp = request_counts_naive[fs_path]
-            time.sleep(0.01)  # force race condition
+            if DEMO_RACE:
+                await asyncio.sleep(0.01)  # force race condition
             request_counts_naive[fs_path] = temp + 1
 
-            # Safe counter
-            with request_counts_lock:
-                if fs_path not in request_counts_safe:
-                    request_counts_safe[fs_path] = 0
-                request_counts_safe[fs_path] += 1
+            # Safe counter: a single increment with no await, so no other task
+            # can interleave and no lock is needed
+            request_counts_safe[fs_path] += 1
 
-            print(f"[{thread_name}] Counts - naive: {request_counts_naive[fs_path]}, safe: {request_counts_safe[fs_path]}")
+            print(f"[{task_name}] Counts - naive: {request_counts_naive[fs_path]}, safe: {request_counts_safe[fs_path]}")
 
         # Serve directories
-        if os.path.isdir(fs_path):
-            content = generate_directory_listing(fs_path, path)
-            header = "HTTP/1.1 200 OK\r\nContent-Type: text/html\r\n\r\n"
-            conn.sendall(header.encode() + content)
-            print(f"[{thread_name}] Served directory: {path}")
+        if st is not None and stat.S_ISDIR(st.st_mode):
+            content = await loop.run_in_executor(None, generate_directory_listing, fs_path, path)
+            writer.writelines((DIR_HEADER, content))
+            await writer.drain()
+            print(f"[{task_name}] Served directory: {path}")
             return
 
         # Serve files
-        if not os.path.isfile(fs_path):
-            header = "HTTP/1.1 404 Not Found\r\nContent-Type: text/html\r\n\r\n"
+        if st is None or not stat.S_ISREG(st.st_mode):
             body = f"<html><body><h1>404 Not Found</h1><p>{path} not found.</p></body></html>"
-            conn.sendall(header.encode() + body.encode())
-            print(f"[{thread_name}] 404 Not Found: {path}")
+            writer.writelines((NOT_FOUND_HEADER, body.encode()))
+            await writer.drain()
+            print(f"[{task_name}] 404 Not Found: {path}")
             return
 
-        mime_type, _ = mimetypes.guess_type(fs_path)
-        if mime_type is None:
-            mime_type = "application/octet-stream"
-
-        with open(fs_path, "rb") as f:
-            content = f.read()
-
-        header = f"HTTP/1.1 200 OK\r\nContent-Type: {mime_type}\r\nContent-Length: {len(content)}\r\n\r\n"
-        conn.sendall(header.encode() + content)
-        print(f"[{thread_name}] Served file: {path}")
+        mime_type = guess_mime_type(fs_path)
+
+        if st.st_size <= FILE_CACHE_MAX_FILE_BYTES:
+            # Small file: serve from memory, reading it from disk only on a miss
+            content = get_cached_file(fs_path, st)
+            if content is None:
+                content = await loop.run_in_executor(None, read_file, fs_path)
+                cache_file(fs_path, st, content)
+
+            header = f"HTTP/1.1 200 OK\r\nContent-Type: {mime_type}\r\nContent-Length: {len(content)}\r\n\r\n"
+            writer.writelines((header.encode(), content))
+            await writer.drain()
+        else:
+            header = f"HTTP/1.1 200 OK\r\nContent-Type: {mime_type}\r\nContent-Length: {st.st_size}\r\n\r\n"
+            # Cork the socket so the header is coalesced with the start of the body
+            set_cork(writer, True)
+            try:
+                writer.write(header.encode())
+                await send_file(loop, writer, fs_path)
+            finally:
+                set_cork(writer, False)
+        print(f"[{task_name}] Served file: {path}")
 
     except Exception as e:
-        print(f"[{thread_name}] Error handling request from {addr}: {e}")
+        print(f"[{task_name}] Error handling request from {addr}: {e}")
     finally:
-        conn.close()
-        print(f"[{thread_name}] Connection closed for {addr}")
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except Exception:
+            pass
+        print(f"[{task_name}] Connection closed for {addr}")
+
+
+async def serve():
+    server = await asyncio.start_server(handle_request, HOST, PORT)
+    loop_name = type(asyncio.get_running_loop()).__module__
+    print(f"Serving HTTP on {HOST}:{PORT} from {ROOT_DIR} ({loop_name} event loop)")
+    async with server:
+        await server.serve_forever()
 
 
 def main():
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.bind((HOST, PORT))
-        s.listen(5)
-        print(f"Serving HTTP on {HOST}:{PORT} from {ROOT_DIR}")
-        while True:
-            conn, addr = s.accept()
-            threading.Thread(target=handle_request, args=(conn, addr), daemon=True).start()
+    if uvloop is not None:
+        uvloop.run(serve())
+    else:
+        asyncio.run(serve())
 
 
 if __name__ == "__main__":
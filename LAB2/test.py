@@ -1,17 +1,41 @@
-import requests
+import asyncio
 import time
-from concurrent.futures import ThreadPoolExecutor
+from collections import Counter
+
+import aiohttp
 
 URL = "http://localhost:8081/doc.pdf"
+NUM_REQUESTS = 1000
+
+# All requests come from one IP, so start the server with a higher limit, e.g.
+#   RATE_LIMIT=100000 python multithread.py
+# otherwise most of them are answered with 429 and the timing measures the rate limiter
+
+
+async def make_request(session, i):
+    try:
+        async with session.get(URL) as r:
+            await r.read()
+            print(f"Request {i} finished with status {r.status}")
+            return r.status
+    except aiohttp.ClientError as e:
+        print(f"Request {i} failed: {e}")
+        return "error"
+
+
+async def run():
+    # limit=0 lifts aiohttp's default cap of 100 open connections
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        return await asyncio.gather(*(make_request(session, i) for i in range(NUM_REQUESTS)))
 
-def make_request(i):
-    r = requests.get(URL)
-    print(f"Request {i} finished with status {r.status_code}")
 
 start = time.time()
 
-with ThreadPoolExecutor(max_workers=20) as executor:
-    executor.map(make_request, range(20))
+statuses = Counter(asyncio.run(run()))
 
 end = time.time()
-print(f"All 10 requests completed in {end - start:.2f} seconds")
+print(f"All {NUM_REQUESTS} requests completed in {end - start:.2f} seconds")
+print("Status codes: " + ", ".join(f"{status}: {count}" for status, count in statuses.most_common()))
+if statuses[429]:
+    print(f"Warning: {statuses[429]} requests were rate limited (429); raise RATE_LIMIT on the server for this test")
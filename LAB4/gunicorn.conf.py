@@ -0,0 +1,14 @@
+import os
+
+# Gunicorn settings for the key-value store nodes (docker-compose sets PORT per node)
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Exactly one worker process: data_store lives in process memory, so a second
+# worker would hold its own, diverging copy of the data. Concurrency comes from
+# the thread pool instead.
+workers = 1
+worker_class = 'gthread'
+threads = int(os.getenv('THREADS', '32'))
+
+# Keep client connections open between requests
+keepalive = 5
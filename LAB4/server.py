@@ -1,24 +1,46 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import os
+import json
+import atexit
 import threading
-import time
-import random
-import requests
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import itertools
+import asyncio
+import concurrent.futures
+import aiohttp
+import numpy as np
 
 app = Flask(__name__)
 
-# In-memory key-value store
-data_store = {}
-data_lock = threading.Lock()
+# In-memory key-value store, split into shards with one lock each so that
+# requests for keys in different shards don't wait on each other
+SHARDS = 16
+data_shards = [{} for _ in range(SHARDS)]
+shard_locks = [threading.Lock() for _ in range(SHARDS)]
+
+def shard_index(key):
+    return hash(key) & (SHARDS - 1)
+
+def store_value(key, value):
+    i = shard_index(key)
+    with shard_locks[i]:
+        data_shards[i][key] = value
 
 # Configuration from environment variables
 NODE_TYPE = os.getenv('NODE_TYPE', 'leader')  # 'leader' or 'follower'
-WRITE_QUORUM = int(os.getenv('WRITE_QUORUM', '3'))  # Number of confirmations needed
+WRITE_QUORUM = int(os.getenv('WRITE_QUORUM', '3'))  # Number of confirmations needed (changeable via POST /admin/quorum)
 MIN_DELAY = float(os.getenv('MIN_DELAY', '0.0001'))  # 0.1ms
 MAX_DELAY = float(os.getenv('MAX_DELAY', '0.001'))    # 1ms
 PORT = int(os.getenv('PORT', '5000'))
 
+# Simulated network delays, drawn in one vectorised call at startup and then
+# consumed round-robin instead of calling the RNG once per replication
+DELAY_POOL_SIZE = 1 << 16
+delay_pool = np.random.uniform(MIN_DELAY, MAX_DELAY, DELAY_POOL_SIZE).tolist()
+delay_index = itertools.count()
+
+def next_delay():
+    return delay_pool[next(delay_index) & (DELAY_POOL_SIZE - 1)]
+
 # Follower addresses (from docker-compose or default)
 followers_env = os.getenv('FOLLOWERS', '')
 if followers_env:
@@ -26,31 +48,77 @@ if followers_env:
 else:
     FOLLOWERS = [f"http://follower{i}:5000" for i in range(1, 6)]
 
+REPLICATION_TIMEOUT = 5  # seconds
+
+# Replication runs on one background event loop with a pooled aiohttp session,
+# both created once at import, so a write does not spawn threads or open fresh
+# TCP connections per follower
+replication_loop = asyncio.new_event_loop()
+threading.Thread(target=replication_loop.run_forever, name='replication-loop', daemon=True).start()
+
+
+async def _create_session():
+    # Drop idle connections before the followers' gunicorn keepalive (5s) does,
+    # so a write never lands on a socket the follower already closed
+    connector = aiohttp.TCPConnector(keepalive_timeout=4)
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=REPLICATION_TIMEOUT)
+    )
+
+replication_session = asyncio.run_coroutine_threadsafe(_create_session(), replication_loop).result()
+
+def _close_replication_session():
+    # Close the session on its own loop at exit so aiohttp doesn't warn about an unclosed session
+    try:
+        asyncio.run_coroutine_threadsafe(replication_session.close(), replication_loop).result(timeout=REPLICATION_TIMEOUT)
+    except Exception as e:
+        print(f"Closing replication session failed: {e}")
+
+atexit.register(_close_replication_session)
+
+# Replications still in flight after the quorum was reached
+pending_replications = set()
+
 @app.route('/status', methods=['GET'])
 def status():
-    """Return node status and current data"""
-    with data_lock:
-        return jsonify({
-            'node_type': NODE_TYPE,
-            'data_count': len(data_store),
-            'data': dict(data_store)
-        })
+    """Return node status and current data, streamed one shard at a time"""
+    def generate():
+        yield '{"node_type": %s, "write_quorum": %d, "data": {' % (json.dumps(NODE_TYPE), WRITE_QUORUM)
+        count = 0
+        for shard, lock in zip(data_shards, shard_locks):
+            # Only one shard is locked at a time, and only while its items are copied
+            with lock:
+                items = list(shard.items())
+            if not items:
+                continue
+            # Dump the shard as a whole object and strip the braces: json.dumps turns
+            # non-string keys (numbers, null) into strings, as jsonify did
+            chunk = json.dumps(dict(items))[1:-1]
+            yield chunk if count == 0 else ', ' + chunk
+            count += len(items)
+        yield '}, "data_count": %d}' % count
+
+    return Response(generate(), mimetype='application/json')
 
 @app.route('/get/<path:key>', methods=['GET'])
 def get_value(key):
     """Get value for a key (works on both leader and followers)"""
-    with data_lock:
-        if key in data_store:
-            return jsonify({
-                'success': True,
-                'key': key,
-                'value': data_store[key]
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': 'Key not found'
-            }), 404
+    i = shard_index(key)
+    with shard_locks[i]:
+        found = key in data_shards[i]
+        value = data_shards[i].get(key)
+    if found:
+        return jsonify({
+            'success': True,
+            'key': key,
+            'value': value
+        })
+    else:
+        return jsonify({
+            'success': False,
+            'error': 'Key not found'
+        }), 404
 
 @app.route('/set', methods=['POST'])
 def set_value():
@@ -72,8 +140,7 @@ def set_value():
     value = data['value']
     
     # Write to leader's own storage
-    with data_lock:
-        data_store[key] = value
+    store_value(key, value)
     
     # Replicate to followers (semi-synchronous)
     success_count = replicate_to_followers(key, value)
@@ -91,6 +158,33 @@ def set_value():
             'error': f'Not enough replicas confirmed. Got {success_count}, need {WRITE_QUORUM}'
         }), 500
 
+@app.route('/admin/quorum', methods=['POST'])
+def set_write_quorum():
+    """Change WRITE_QUORUM at runtime (leader only), so experiments don't need a restart"""
+    global WRITE_QUORUM
+    if NODE_TYPE != 'leader':
+        return jsonify({
+            'success': False,
+            'error': 'Only the leader has a write quorum'
+        }), 403
+    
+    data = request.get_json(silent=True)
+    value = data.get('value') if isinstance(data, dict) else None
+    if type(value) is not int or not 1 <= value <= len(FOLLOWERS):
+        return jsonify({
+            'success': False,
+            'error': f'Invalid request. Need value between 1 and {len(FOLLOWERS)}'
+        }), 400
+    
+    # A plain global is enough because the app runs in a single gunicorn worker
+    WRITE_QUORUM = value
+    print(f"Write quorum set to {WRITE_QUORUM}")
+    
+    return jsonify({
+        'success': True,
+        'write_quorum': WRITE_QUORUM
+    })
+
 @app.route('/replicate', methods=['POST'])
 def replicate():
     """Receive replication request from leader (followers only)"""
@@ -111,61 +205,64 @@ def replicate():
     value = data['value']
     
     # Write to follower's storage
-    with data_lock:
-        data_store[key] = value
+    store_value(key, value)
     
     return jsonify({
         'success': True,
         'key': key
     })
 
-def replicate_to_followers(key, value):
+async def _replicate_to_followers(key, value):
     """
     Replicate data to followers with simulated network delay.
-    Returns the number of successful confirmations.
-    Uses concurrent requests with individual delays.
+    Returns the number of successful confirmations as soon as the quorum is
+    reached; the remaining replications keep running in the background.
     """
-    def replicate_to_one_follower(follower_url):
+    async def replicate_to_one_follower(follower_url):
         try:
             # Simulate network lag
-            delay = random.uniform(MIN_DELAY, MAX_DELAY)
-            time.sleep(delay)
+            await asyncio.sleep(next_delay())
             
             # Send replication request
-            response = requests.post(
+            async with replication_session.post(
                 f"{follower_url}/replicate",
-                json={'key': key, 'value': value},
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                return True
-            return False
+                json={'key': key, 'value': value}
+            ) as response:
+                return response.status == 200
         except Exception as e:
             print(f"Replication to {follower_url} failed: {e}")
             return False
     
     # Send replication requests concurrently
+    tasks = [asyncio.ensure_future(replicate_to_one_follower(follower)) for follower in FOLLOWERS]
+    for task in tasks:
+        pending_replications.add(task)
+        task.add_done_callback(pending_replications.discard)
+    
     success_count = 0
-    with ThreadPoolExecutor(max_workers=len(FOLLOWERS)) as executor:
-        futures = [
-            executor.submit(replicate_to_one_follower, follower)
-            for follower in FOLLOWERS
-        ]
-        
-        for future in as_completed(futures):
-            if future.result():
-                success_count += 1
-                # Early return if we have enough confirmations
-                if success_count >= WRITE_QUORUM:
-                    break
+    for next_done in asyncio.as_completed(tasks):
+        if await next_done:
+            success_count += 1
+            # Early return if we have enough confirmations
+            if success_count >= WRITE_QUORUM:
+                break
     
     return success_count
 
+def replicate_to_followers(key, value):
+    """Run the replication on the background loop and wait for the quorum"""
+    future = asyncio.run_coroutine_threadsafe(_replicate_to_followers(key, value), replication_loop)
+    try:
+        return future.result(timeout=REPLICATION_TIMEOUT)
+    except concurrent.futures.TimeoutError:
+        future.cancel()
+        print(f"Replication of {key} timed out after {REPLICATION_TIMEOUT}s")
+        return 0
+
 if __name__ == '__main__':
     print(f"Starting {NODE_TYPE} node on port {PORT}")
     print(f"Write quorum: {WRITE_QUORUM}")
     print(f"Delay range: {MIN_DELAY*1000:.2f}ms - {MAX_DELAY*1000:.2f}ms")
     
-    # Run Flask with threading enabled for concurrent request handling
+    # Development server only; the containers run the app under gunicorn (see gunicorn.conf.py)
     app.run(host='0.0.0.0', port=PORT, threaded=True)
\ No newline at end of file
@@ -1,11 +1,14 @@
 import requests
-import subprocess
-import json
+from concurrent.futures import ThreadPoolExecutor
+
+LEADER_URL = "http://localhost:5000"
+# Follower ports published by docker-compose
+FOLLOWERS = {f"follower{i}": f"http://localhost:500{i}" for i in range(1, 6)}
 
 def get_leader_data():
     """Get all data from the leader"""
     try:
-        response = requests.get("http://localhost:5000/status", timeout=5)
+        response = requests.get(f"{LEADER_URL}/status", timeout=5)
         if response.status_code == 200:
             data = response.json()
             return data['data'], data['data_count']
@@ -14,18 +17,16 @@ def get_leader_data():
         print(f"Error connecting to leader: {e}")
         return None, 0
 
-def get_follower_data(follower_container):
-    """Get data from a follower by executing Python inside the container"""
+def get_follower_data(follower_url):
+    """Get all data from a follower through its published port"""
     try:
-        cmd = f"docker exec {follower_container} python -c \"import requests; import json; print(json.dumps(requests.get('http://localhost:5000/status').json()))\""
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            data = json.loads(result.stdout)
+        response = requests.get(f"{follower_url}/status", timeout=5)
+        if response.status_code == 200:
+            data = response.json()
             return data['data'], data['data_count']
         return None, 0
     except Exception as e:
-        print(f"Error getting data from {follower_container}: {e}")
+        print(f"Error getting data from {follower_url}: {e}")
         return None, 0
 
 def compare_data(leader_data, follower_data, follower_name):
@@ -81,12 +82,13 @@ def main():
     
     # Check each follower
     print("\n[2] Checking followers...\n")
-    followers = ['follower1', 'follower2', 'follower3', 'follower4', 'follower5']
+    # Query all followers at once instead of one after another
+    with ThreadPoolExecutor(max_workers=len(FOLLOWERS)) as executor:
+        follower_responses = dict(zip(FOLLOWERS, executor.map(get_follower_data, FOLLOWERS.values())))
     results = {}
     
-    for follower in followers:
+    for follower, (follower_data, follower_count) in follower_responses.items():
         print(f"Checking {follower}...")
-        follower_data, follower_count = get_follower_data(follower)
         
         if follower_data is None:
             print(f"  ✗ Failed to connect")
@@ -1,15 +1,22 @@
 import requests
+from nodelay_adapter import NoDelayAdapter
 import time
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 LEADER_URL = "http://localhost:5000"
+
+# One session for the whole run so requests reuse keep-alive connections
+# instead of opening a new TCP connection each time (pool sized for the handful of test requests)
+SESSION = requests.Session()
+SESSION.mount("http://", NoDelayAdapter(pool_connections=20, pool_maxsize=10, max_retries=0))
 FOLLOWERS = [f"http://localhost:500{i}" for i in range(1, 6)]
 
 def test_leader_status():
     """Test if leader is running and responding"""
     print("\n=== Testing Leader Status ===")
     try:
-        response = requests.get(f"{LEADER_URL}/status", timeout=5)
+        response = SESSION.get(f"{LEADER_URL}/status", timeout=5)
         if response.status_code == 200:
             data = response.json()
             print(f"✓ Leader is running: {data['node_type']}")
@@ -26,7 +33,7 @@ def test_write_operation():
     """Test basic write operation"""
     print("\n=== Testing Write Operation ===")
     try:
-        response = requests.post(
+        response = SESSION.post(
             f"{LEADER_URL}/set",
             json={"key": "test_key", "value": "test_value"},
             timeout=10
@@ -52,7 +59,7 @@ def test_read_from_leader():
     """Test reading from leader"""
     print("\n=== Testing Read from Leader ===")
     try:
-        response = requests.get(f"{LEADER_URL}/get/test_key", timeout=5)
+        response = SESSION.get(f"{LEADER_URL}/get/test_key", timeout=5)
         
         if response.status_code == 200:
             data = response.json()
@@ -78,7 +85,7 @@ def test_replication():
     test_value = "replicated_value"
     
     print(f"Writing key '{test_key}' to leader...")
-    response = requests.post(
+    response = SESSION.post(
         f"{LEADER_URL}/set",
         json={"key": test_key, "value": test_value},
         timeout=10
@@ -117,19 +124,23 @@ def test_multiple_writes():
         ("key5", "value5"),
     ]
     
-    success_count = 0
-    for key, value in test_data:
+    def write_one(item):
+        key, value = item
         try:
-            response = requests.post(
+            response = SESSION.post(
                 f"{LEADER_URL}/set",
                 json={"key": key, "value": value},
                 timeout=10
             )
             
-            if response.status_code == 200 and response.json()['success']:
-                success_count += 1
+            return response.status_code == 200 and response.json()['success']
         except Exception as e:
             print(f"  ✗ Write failed for {key}: {e}")
+            return False
+    
+    # Send the writes concurrently so they take one round trip instead of five
+    with ThreadPoolExecutor(max_workers=len(test_data)) as executor:
+        success_count = sum(executor.map(write_one, test_data))
     
     print(f"✓ {success_count}/{len(test_data)} writes successful")
     return success_count == len(test_data)
@@ -142,19 +153,22 @@ def test_read_consistency():
     test_keys = ["key1", "key2", "key3", "key4", "key5"]
     expected_values = ["value1", "value2", "value3", "value4", "value5"]
     
-    success_count = 0
-    for key, expected_value in zip(test_keys, expected_values):
+    def read_one(key, expected_value):
         try:
-            response = requests.get(f"{LEADER_URL}/get/{key}", timeout=5)
+            response = SESSION.get(f"{LEADER_URL}/get/{key}", timeout=5)
             
             if response.status_code == 200:
                 data = response.json()
                 if data['success'] and data['value'] == expected_value:
-                    success_count += 1
-                else:
-                    print(f"  ✗ Value mismatch for {key}: expected {expected_value}, got {data.get('value')}")
+                    return True
+                print(f"  ✗ Value mismatch for {key}: expected {expected_value}, got {data.get('value')}")
         except Exception as e:
             print(f"  ✗ Read failed for {key}: {e}")
+        return False
+    
+    # Read all keys concurrently
+    with ThreadPoolExecutor(max_workers=len(test_keys)) as executor:
+        success_count = sum(executor.map(read_one, test_keys, expected_values))
     
     print(f"✓ {success_count}/{len(test_keys)} reads consistent")
     return success_count == len(test_keys)
@@ -196,4 +210,7 @@ def main():
     return 0 if failed == 0 else 1
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    try:
+        sys.exit(main())
+    finally:
+        SESSION.close()
\ No newline at end of file
@@ -0,0 +1,15 @@
+import socket
+from requests.adapters import HTTPAdapter
+
+# Options for every client socket the test scripts open: no Nagle delay on the
+# small JSON requests, and TCP keepalive on the long-lived pooled connections
+SOCKET_OPTIONS = [
+    (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+]
+
+class NoDelayAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled connections are opened with SOCKET_OPTIONS"""
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs["socket_options"] = SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
@@ -1,44 +1,83 @@
 import requests
+from nodelay_adapter import NoDelayAdapter, SOCKET_OPTIONS
+import httpx
+import asyncio
 import time
-import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import statistics
 import json
+import orjson
+from array import array
+import numpy as np
 
 LEADER_URL = "http://localhost:5000"
 
-def write_key_value(key, value):
+# One session for the status checks so they reuse a keep-alive connection
+# (the write benchmark itself runs on an httpx.AsyncClient)
+SESSION = requests.Session()
+SESSION.mount("http://", NoDelayAdapter(pool_connections=1, pool_maxsize=4, max_retries=0))
+
+# Write bodies are serialized up front (orjson returns bytes), so the hot loop only sends bytes
+JSON_HEADERS = {"Content-Type": "application/json", "Connection": "keep-alive"}
+
+PROGRESS_INTERVAL = 0.5  # seconds between progress lines
+
+def encode_write(key, value):
+    return orjson.dumps({"key": key, "value": value})
+
+async def write_key_value(client, key, body):
     """
-    Write a key-value pair and measure the latency.
-    Returns (latency_seconds, success)
+    Write a pre-encoded key-value body (see encode_write) and measure the latency.
+    Returns (latency_ns, success)
     """
-    start_time = time.time()
+    t0 = time.perf_counter_ns()
     try:
-        response = requests.post(
-            f"{LEADER_URL}/set",
-            json={"key": key, "value": value},
-            timeout=30
-        )
-        latency = time.time() - start_time
+        response = await client.post("/set", content=body, headers=JSON_HEADERS)
+        latency = time.perf_counter_ns() - t0
         
-        if response.status_code == 200 and response.json()['success']:
+        if response.status_code == 200 and orjson.loads(response.content)['success']:
             return (latency, True)
         else:
             return (latency, False)
     except Exception as e:
-        latency = time.time() - start_time
+        latency = time.perf_counter_ns() - t0
         print(f"Write failed for {key}: {e}")
         return (latency, False)
 
-def run_concurrent_writes(num_writes=10000, num_keys=100, num_threads=20):
+async def _run_writes(tasks, concurrency):
+    """Drive all writes from one event loop, at most `concurrency` in flight"""
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    transport = httpx.AsyncHTTPTransport(limits=limits, socket_options=SOCKET_OPTIONS)
+    semaphore = asyncio.Semaphore(concurrency)
+    completed = 0
+    
+    async def report_progress():
+        # Sample the counter periodically instead of checking it on every completion
+        while True:
+            await asyncio.sleep(PROGRESS_INTERVAL)
+            print(f"Progress: {completed}/{len(tasks)} writes completed...")
+    
+    async with httpx.AsyncClient(base_url=LEADER_URL, transport=transport, timeout=30) as client:
+        async def write_when_ready(key, body):
+            nonlocal completed
+            async with semaphore:
+                result = await write_key_value(client, key, body)
+            completed += 1
+            return result
+        
+        monitor = asyncio.ensure_future(report_progress())
+        try:
+            return await asyncio.gather(*(write_when_ready(key, body) for key, body in tasks))
+        finally:
+            monitor.cancel()
+
+def run_concurrent_writes(num_writes=10000, num_keys=100, concurrency=20):
     """
     Perform concurrent writes to test performance.
     Distributes writes across num_keys keys.
-    Returns list of latencies for successful writes.
+    Returns latencies of successful writes as an array('q') of nanoseconds.
     """
     print(f"\n{'='*60}")
     print(f"Running {num_writes} concurrent writes across {num_keys} keys")
-    print(f"Using {num_threads} threads")
+    print(f"Using up to {concurrency} concurrent requests")
     print(f"{'='*60}\n")
     
     # Generate write tasks
@@ -46,33 +85,19 @@ def run_concurrent_writes(num_writes=10000, num_keys=100, num_threads=20):
     for i in range(num_writes):
         key = f"key_{i % num_keys}"  # Distribute across num_keys keys
         value = f"value_{i}"
-        tasks.append((key, value))
-    
-    latencies = []
-    success_count = 0
-    failed_count = 0
+        tasks.append((key, encode_write(key, value)))
     
     start_time = time.time()
     
     # Execute writes concurrently
-    with ThreadPoolExecutor(max_workers=num_threads) as executor:
-        futures = [executor.submit(write_key_value, key, value) for key, value in tasks]
-        
-        completed = 0
-        for future in as_completed(futures):
-            latency, success = future.result()
-            if success:
-                latencies.append(latency)
-                success_count += 1
-            else:
-                failed_count += 1
-            
-            completed += 1
-            if completed % 1000 == 0:
-                print(f"Progress: {completed}/{num_writes} writes completed...")
+    results = asyncio.run(_run_writes(tasks, concurrency))
     
     total_time = time.time() - start_time
     
+    latencies = array('q', (latency for latency, success in results if success))
+    success_count = len(latencies)
+    failed_count = num_writes - success_count
+    
     print(f"\n{'='*60}")
     print(f"Completed: {success_count} successful, {failed_count} failed")
     print(f"Total time: {total_time:.2f} seconds")
@@ -87,21 +112,23 @@ def analyze_latencies(latencies):
         print("No latency data to analyze")
         return {}
     
+    # View the int64 nanosecond samples without copying, then convert to seconds once;
+    # np.percentile selects instead of sorting a copy
+    arr = np.frombuffer(latencies, dtype=np.int64) * 1e-9
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    
     stats = {
         'count': len(latencies),
-        'mean': statistics.mean(latencies),
-        'median': statistics.median(latencies),
-        'min': min(latencies),
-        'max': max(latencies),
-        'stdev': statistics.stdev(latencies) if len(latencies) > 1 else 0,
+        'mean': float(arr.mean()),
+        'median': float(p50),
+        'min': float(arr.min()),
+        'max': float(arr.max()),
+        'stdev': float(arr.std(ddof=1)) if len(latencies) > 1 else 0,
+        'p50': float(p50),
+        'p95': float(p95),
+        'p99': float(p99),
     }
     
-    # Calculate percentiles
-    sorted_latencies = sorted(latencies)
-    stats['p50'] = sorted_latencies[int(len(sorted_latencies) * 0.50)]
-    stats['p95'] = sorted_latencies[int(len(sorted_latencies) * 0.95)]
-    stats['p99'] = sorted_latencies[int(len(sorted_latencies) * 0.99)]
-    
     print(f"Latency Statistics:")
     print(f"  Count:      {stats['count']}")
     print(f"  Mean:       {stats['mean']*1000:.2f} ms")
@@ -126,12 +153,12 @@ def check_data_consistency(num_keys=100):
     
     # Get data from leader
     try:
-        response = requests.get(f"{LEADER_URL}/status", timeout=5)
+        response = SESSION.get(f"{LEADER_URL}/status", timeout=5)
         if response.status_code != 200:
             print("✗ Failed to get leader status")
             return False
         
-        leader_data = response.json()['data']
+        leader_data = orjson.loads(response.content)['data']
         print(f"Leader has {len(leader_data)} keys")
         
         # For this test, we'll just verify the leader has the data
@@ -164,12 +191,12 @@ def main():
     
     # Check if leader is available
     try:
-        response = requests.get(f"{LEADER_URL}/status", timeout=5)
+        response = SESSION.get(f"{LEADER_URL}/status", timeout=5)
         if response.status_code != 200:
             print("✗ Leader is not responding. Start with: docker-compose up -d")
             return 1
         
-        config = response.json()
+        config = orjson.loads(response.content)
         print(f"\n✓ Leader is ready")
         print(f"  Node type: {config['node_type']}")
         print(f"  Current data count: {config['data_count']}")
@@ -181,13 +208,13 @@ def main():
     # Run performance test
     NUM_WRITES = 10000
     NUM_KEYS = 100
-    NUM_THREADS = 20
+    CONCURRENCY = 20
     
     print(f"\nStarting performance test...")
     latencies = run_concurrent_writes(
         num_writes=NUM_WRITES,
         num_keys=NUM_KEYS,
-        num_threads=NUM_THREADS
+        concurrency=CONCURRENCY
     )
     
     # Analyze results
@@ -203,8 +230,8 @@ def main():
     results = {
         'num_writes': NUM_WRITES,
         'num_keys': NUM_KEYS,
-        'num_threads': NUM_THREADS,
-        'latencies': latencies,
+        'concurrency': CONCURRENCY,
+        'latencies_ns': latencies.tolist(),
         'stats': stats
     }
     
@@ -218,4 +245,7 @@ def main():
 
 if __name__ == "__main__":
     import sys
-    sys.exit(main())
\ No newline at end of file
+    try:
+        sys.exit(main())
+    finally:
+        SESSION.close()
\ No newline at end of file
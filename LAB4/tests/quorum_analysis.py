@@ -1,112 +1,119 @@
 import requests
+from nodelay_adapter import NoDelayAdapter
 import time
-import subprocess
 import json
-from concurrent.futures import ThreadPoolExecutor, as_completed
-import statistics
+import orjson
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+import matplotlib
+matplotlib.use("Agg")  # render straight to file, no GUI toolkit
 import matplotlib.pyplot as plt
 import numpy as np
 
 LEADER_URL = "http://localhost:5000"
 
+# One session for the whole run so requests reuse keep-alive connections
+# instead of opening a new TCP connection each time (pool sized for 2x the 20 writer threads)
+SESSION = requests.Session()
+SESSION.mount("http://", NoDelayAdapter(pool_connections=20, pool_maxsize=40, max_retries=0))
+
+# Write bodies are serialized up front (orjson returns bytes), so the hot loop only sends bytes
+JSON_HEADERS = {"Content-Type": "application/json", "Connection": "keep-alive"}
+
+def encode_write(key, value):
+    return orjson.dumps({"key": key, "value": value})
+
+# /set request prepared once (URL parsing, session header and cookie merging);
+# each write only copies it and swaps in its body
+SET_TEMPLATE = SESSION.prepare_request(requests.Request("POST", f"{LEADER_URL}/set", headers=JSON_HEADERS))
+
 def update_write_quorum(quorum_value):
     """
-    Update the WRITE_QUORUM in docker-compose.yml and restart services.
+    Change WRITE_QUORUM on the running leader instead of restarting the cluster.
+    Requires the leader's POST /admin/quorum endpoint ({"value": k}), which is
+    applied immediately and reported back as write_quorum in /status.
     """
     print(f"\nUpdating WRITE_QUORUM to {quorum_value}...")
     
-    # Read docker-compose.yml
-    with open('docker-compose.yml', 'r') as f:
-        content = f.read()
-    
-    # Replace WRITE_QUORUM value
-    lines = content.split('\n')
-    new_lines = []
-    for line in lines:
-        if 'WRITE_QUORUM=' in line:
-            # Preserve indentation
-            indent = len(line) - len(line.lstrip())
-            new_lines.append(' ' * indent + f'- WRITE_QUORUM={quorum_value}')
-        else:
-            new_lines.append(line)
-    
-    # Write back
-    with open('docker-compose.yml', 'w') as f:
-        f.write('\n'.join(new_lines))
-    
-    # Restart services
-    print("Restarting docker-compose services...")
-    subprocess.run(['docker-compose', 'down'], capture_output=True)
-    subprocess.run(['docker-compose', 'up', '-d'], capture_output=True)
-    
-    # Wait for services to be ready
-    print("Waiting for services to be ready...")
-    time.sleep(5)
+    try:
+        response = SESSION.post(f"{LEADER_URL}/admin/quorum", json={"value": quorum_value}, timeout=5)
+        if response.status_code != 200:
+            print(f"✗ Leader rejected quorum {quorum_value}: {response.text}")
+            return False
+    except requests.RequestException as e:
+        print(f"✗ Cannot reach leader: {e}")
+        return False
     
     # Verify
-    for i in range(10):
+    for i in range(50):
         try:
-            response = requests.get(f"{LEADER_URL}/status", timeout=2)
-            if response.status_code == 200:
-                print("✓ Services are ready")
+            response = SESSION.get(f"{LEADER_URL}/status", timeout=2)
+            if response.status_code == 200 and orjson.loads(response.content).get('write_quorum') == quorum_value:
+                print("✓ Leader is using the new quorum")
                 return True
-        except:
-            time.sleep(1)
+        except requests.RequestException:
+            pass
+        time.sleep(0.1)
     
-    print("✗ Services did not start properly")
+    print("✗ Leader did not pick up the new quorum")
     return False
 
-def write_key_value(key, value):
-    """Write a key-value pair and measure latency"""
-    start_time = time.time()
+def write_key_value(key, body):
+    """Write a pre-encoded key-value body (see encode_write) and measure latency in ns"""
+    t0 = time.perf_counter_ns()
     try:
-        response = requests.post(
-            f"{LEADER_URL}/set",
-            json={"key": key, "value": value},
-            timeout=30
-        )
-        latency = time.time() - start_time
+        prepared = SET_TEMPLATE.copy()
+        prepared.body = body
+        prepared.headers["Content-Length"] = str(len(body))
+        response = SESSION.send(prepared, timeout=30)
+        latency = time.perf_counter_ns() - t0
         
-        if response.status_code == 200 and response.json()['success']:
+        if response.status_code == 200 and orjson.loads(response.content)['success']:
             return (latency, True)
         else:
             return (latency, False)
     except Exception as e:
-        latency = time.time() - start_time
+        latency = time.perf_counter_ns() - t0
         return (latency, False)
 
-def run_writes_for_quorum(quorum, num_writes=10000, num_keys=100, num_threads=20):
+def build_writes(num_writes=10000, num_keys=100):
+    """
+    Generate the write workload once: (keys, pre-encoded bodies), distributed
+    across num_keys keys. The same tuples are reused for every quorum value.
+    """
+    keys = tuple(f"key_{i % num_keys}" for i in range(num_writes))
+    bodies = tuple(encode_write(key, f"value_{i}") for i, key in enumerate(keys))
+    return keys, bodies
+
+def run_writes_for_quorum(quorum, writes, num_threads=20):
     """
-    Run writes with a specific quorum value and collect latencies.
+    Run writes (from build_writes) with a specific quorum value and collect latencies.
     """
     print(f"\n{'='*60}")
     print(f"Testing with WRITE_QUORUM = {quorum}")
     print(f"{'='*60}")
     
-    # Generate write tasks
-    tasks = [(f"key_{i % num_keys}", f"value_{i}") for i in range(num_writes)]
-    
-    latencies = []
-    success_count = 0
+    keys, bodies = writes
+    num_writes = len(keys)
     
     start_time = time.time()
     
-    # Execute writes concurrently
+    # Execute writes concurrently; only collect raw (latency, ok) pairs here
+    # and aggregate once every write has finished
     with ThreadPoolExecutor(max_workers=num_threads) as executor:
-        futures = [executor.submit(write_key_value, key, value) for key, value in tasks]
-        
-        for future in as_completed(futures):
-            latency, success = future.result()
-            if success:
-                latencies.append(latency)
-                success_count += 1
+        results = list(executor.map(write_key_value, keys, bodies))
     
     total_time = time.time() - start_time
     
+    latencies = array('q', (latency for latency, success in results if success))  # nanoseconds
+    success_count = len(latencies)
+    
     if latencies:
-        avg_latency = statistics.mean(latencies)
-        median_latency = statistics.median(latencies)
-        p95_latency = sorted(latencies)[int(len(latencies) * 0.95)]
+        arr = np.frombuffer(latencies, dtype=np.int64) * 1e-9
+        avg_latency = float(arr.mean())
+        median_latency, p95_latency, p99_latency = (float(p) for p in np.percentile(arr, [50, 95, 99]))
+        # Keep only a 50-bin histogram for the distribution plot, not every sample
+        counts, edges = np.histogram(arr * 1000.0, bins=50)
         
         print(f"\nResults for WRITE_QUORUM={quorum}:")
         print(f"  Successful writes: {success_count}/{num_writes}")
@@ -124,7 +131,8 @@ def run_writes_for_quorum(quorum, num_writes=10000, num_keys=100, num_threads=20
             'avg_latency': avg_latency,
             'median_latency': median_latency,
             'p95_latency': p95_latency,
-            'latencies': latencies
+            'p99_latency': p99_latency,
+            'histogram': {'counts': counts.tolist(), 'edges_ms': edges.tolist()}
         }
     else:
         print(f"✗ No successful writes for quorum {quorum}")
@@ -137,9 +145,9 @@ def check_data_consistency():
     print(f"{'='*60}\n")
     
     try:
-        response = requests.get(f"{LEADER_URL}/status", timeout=5)
+        response = SESSION.get(f"{LEADER_URL}/status", timeout=5)
         if response.status_code == 200:
-            leader_data = response.json()['data']
+            leader_data = orjson.loads(response.content)['data']
             print(f"✓ Leader has {len(leader_data)} keys")
             print(f"✓ Data consistency check passed")
             print(f"  (Note: In production, you'd compare all replicas)")
@@ -192,10 +200,12 @@ def plot_results(results):
     
     # Plot 3: Latency distribution for each quorum
     for result in results:
-        ax3.hist(
-            [l * 1000 for l in result['latencies']], 
-            bins=50, 
-            alpha=0.5, 
+        # The histogram was binned in run_writes_for_quorum, matplotlib only draws it
+        ax3.stairs(
+            result['histogram']['counts'],
+            result['histogram']['edges_ms'],
+            fill=True,
+            alpha=0.5,
             label=f"Quorum {result['quorum']}"
         )
     ax3.set_xlabel('Latency (ms)', fontsize=12, fontweight='bold')
@@ -214,10 +224,10 @@ def plot_results(results):
     ax4.grid(True, alpha=0.3, axis='y')
     ax4.set_xticks(quorums)
     
-    plt.tight_layout()
-    plt.savefig('quorum_analysis.png', dpi=300, bbox_inches='tight')
+    fig.tight_layout()
+    fig.savefig('quorum_analysis.png', dpi=120, bbox_inches='tight')
+    plt.close(fig)
     print(f"\n✓ Plot saved as 'quorum_analysis.png'")
-    plt.show()
 
 def generate_analysis_report(results):
     """Generate a text report explaining the results"""
@@ -277,7 +287,7 @@ def main():
     print("2. Measure average latency for each quorum")
     print("3. Generate plots and analysis")
     print("4. Check data consistency")
-    print("\nNote: This will restart docker-compose multiple times!")
+    print("\nNote: The quorum is changed on the running leader (POST /admin/quorum)")
     
     input("\nPress Enter to start (or Ctrl+C to cancel)...")
     
@@ -288,14 +298,14 @@ def main():
     NUM_THREADS = 20
     
     results = []
+    writes = build_writes(num_writes=NUM_WRITES, num_keys=NUM_KEYS)
     
     # Test each quorum value
     for quorum in QUORUM_VALUES:
         if update_write_quorum(quorum):
             result = run_writes_for_quorum(
                 quorum=quorum,
-                num_writes=NUM_WRITES,
-                num_keys=NUM_KEYS,
+                writes=writes,
                 num_threads=NUM_THREADS
             )
             if result:
@@ -308,12 +318,7 @@ def main():
     
     # Save results
     with open('quorum_analysis_results.json', 'w') as f:
-        # Remove large latencies array for JSON
-        results_to_save = [
-            {k: v for k, v in r.items() if k != 'latencies'} 
-            for r in results
-        ]
-        json.dump(results_to_save, f, indent=2)
+        json.dump(results, f, indent=2)
     
     print(f"\n✓ Results saved to 'quorum_analysis_results.json'")
     
@@ -334,4 +339,7 @@ def main():
 
 if __name__ == "__main__":
     import sys
-    sys.exit(main())
\ No newline at end of file
+    try:
+        sys.exit(main())
+    finally:
+        SESSION.close()
\ No newline at end of file